@@ -11,173 +11,436 @@ This script automates the complete password reset flow:
 6. Verifies login success
 
 Requirements:
-    pip install boto3 selenium webdriver-manager beautifulsoup4
+    pip install boto3 selenium webdriver-manager imapclient
 """
 
 import argparse
 import json
+import logging
 import os
 import sys
 import time
+import random
 import re
-import imaplib
+import subprocess
+import threading
 import email
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from email.header import decode_header
 from datetime import datetime, timedelta
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+# Optional: faster JSON (de)serialization
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LOGLEVEL = os.environ.get('LOGLEVEL', 'INFO').upper()
+# getLevelName maps known names to their number and anything else to a string
+LOGLEVEL_IS_VALID = isinstance(logging.getLevelName(LOGLEVEL), int)
+
+logging.basicConfig(
+    level=LOGLEVEL if LOGLEVEL_IS_VALID else logging.INFO,
+    # Threads are named after the account they work on, to tell parallel runs apart
+    format='%(asctime)s %(levelname)s [%(threadName)s] %(message)s'
+)
+log = logging.getLogger(__name__)
+
+if not LOGLEVEL_IS_VALID:
+    log.warning(f"⚠ Unknown LOGLEVEL '{LOGLEVEL}', using INFO")
+
 try:
     from selenium import webdriver
     from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
     from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.chrome.service import Service
+    from selenium.common.exceptions import TimeoutException
     from webdriver_manager.chrome import ChromeDriverManager
-    from bs4 import BeautifulSoup
+    from imapclient import IMAPClient, SocketTimeout
+    from imapclient.exceptions import LoginError
 except ImportError:
-    print("ERROR: Required packages not installed")
-    print("Run: pip install boto3 selenium webdriver-manager beautifulsoup4")
+    log.error("Required packages not installed\n"
+              "Run: pip install boto3 selenium webdriver-manager imapclient")
     sys.exit(1)
 
+# RFC 2177: servers may drop an IDLE after 30 minutes, so re-issue it before then
+IMAP_IDLE_TIMEOUT = 29 * 60
+
+# Keeps a stalled server from blocking the email watcher forever; idle_check
+# lifts the read timeout for its own wait
+IMAP_SOCKET_TIMEOUT = SocketTimeout(connect=10, read=60)
+
+# Resolved ChromeDriver path, keyed by Chrome major version
+CHROMEDRIVER_CACHE_FILE = os.path.expanduser('~/.cache/aws-root-reset/chromedriver_path')
+CHROME_BINARIES = [
+    'google-chrome',
+    'chromium',
+    'chromium-browser',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+]
+
+# Fills inputs by ID and clicks a button in one WebDriver round-trip. The native
+# value setter plus input/change events make framework-managed forms see the change.
+FILL_AND_SUBMIT_SCRIPT = """
+const setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+for (const [id, value] of Object.entries(arguments[0])) {
+    const field = document.getElementById(id);
+    setValue.call(field, value);
+    field.dispatchEvent(new Event('input', {bubbles: true}));
+    field.dispatchEvent(new Event('change', {bubbles: true}));
+}
+document.getElementById(arguments[1]).click();
+"""
+
+# CAPTCHA widgets on the AWS sign-in page
+CAPTCHA_SELECTOR = ', '.join([
+    'iframe[src*="recaptcha"]',
+    'iframe[src*="captcha"]',
+    '[id*="captcha" i]',
+    '[class*="captcha" i]',
+])
+
+# One boto3 session for every client, so credentials are resolved once
+AWS_SESSION = boto3.Session()
+
+# Adaptive retries back off on Secrets Manager throttling, which parallel runs
+# can hit; short timeouts fail fast instead of stalling a run on a dead connection
+SECRETS_CLIENT_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 3},
+    connect_timeout=3,
+    read_timeout=10
+)
+
+# Pages reached after submitting the reset and sign-in forms. Anchored on the
+# host/path, since the sign-in page's own URL carries the console address in
+# its redirect_uri query parameter.
+CONSOLE_URL = r'^https://([a-z0-9-]+\.)?console\.aws\.amazon\.com/'
+# (?i) is inline so it survives being passed to EC.url_matches as a string.
+RESET_DONE_URL_PATTERN = re.compile(r'(?i)' + CONSOLE_URL + r'|^https://[^/?#]+/[^?#]*success')
+LOGIN_DONE_URL_PATTERN = re.compile(r'(?i)' + CONSOLE_URL + r'|^https://[^/?#]+/[^?#]*captcha')
+
+# AWS password reset link, with or without an account-specific subdomain
+RESET_LINK_PATTERN = re.compile(
+    r'https://(?:[a-z0-9\-]+\.)?signin\.aws\.amazon\.com/resetpassword\?token=[A-Za-z0-9\-_]+'
+)
+
+
+def json_loads(data):
+    """Parse JSON, using orjson when it is installed"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj):
+    """Serialize to a JSON string, using orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def backoff_delay(attempt):
+    """Seconds to wait before retry number attempt: 1s growing to 10s, with jitter"""
+    return min(10.0, 1.0 * 1.6 ** attempt) * random.uniform(0.8, 1.2)
+
+
+def create_secrets_client():
+    """Create a Secrets Manager client for the configured region"""
+    region = os.environ.get('AWS_REGION', 'us-east-1')
+    return AWS_SESSION.client('secretsmanager', region_name=region, config=SECRETS_CLIENT_CONFIG)
+
+
+def get_chromedriver_path():
+    """Return a ChromeDriver path, only asking ChromeDriverManager when Chrome changed"""
+    driver_path = os.environ.get('CHROMEDRIVER_PATH')
+    if driver_path and os.path.exists(driver_path):
+        return driver_path
+
+    chrome_version = get_chrome_major_version()
+
+    try:
+        with open(CHROMEDRIVER_CACHE_FILE, 'r') as f:
+            cached = json.load(f)
+        if (chrome_version and cached.get('chrome_version') == chrome_version
+                and os.path.exists(cached.get('path', ''))):
+            return cached['path']
+    except (OSError, ValueError):
+        pass
+
+    driver_path = ChromeDriverManager().install()
+
+    if chrome_version:
+        try:
+            os.makedirs(os.path.dirname(CHROMEDRIVER_CACHE_FILE), exist_ok=True)
+            with open(CHROMEDRIVER_CACHE_FILE, 'w') as f:
+                json.dump({'chrome_version': chrome_version, 'path': driver_path}, f)
+        except OSError as e:
+            log.info(f"Note: Could not cache ChromeDriver path: {e}")
+
+    return driver_path
+
+
+def get_chrome_major_version():
+    """Return the installed Chrome major version, or None if it can't be determined"""
+    for binary in CHROME_BINARIES:
+        try:
+            output = subprocess.check_output(
+                [binary, '--version'], stderr=subprocess.DEVNULL, timeout=10
+            ).decode()
+        except (OSError, subprocess.SubprocessError):
+            continue
+
+        match = re.search(r'(\d+)\.\d+', output)
+        if match:
+            return match.group(1)
+
+    return None
+
+
+class Browser:
+    """Chrome session that can be shared by several AWSRootPasswordReset runs"""
+
+    def __init__(self, headless=True, driver_path=None):
+        self.headless = headless
+        # Resolved on first start unless given, e.g. once up front for parallel runs
+        self.driver_path = driver_path
+        self.driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.quit()
+
+    def start(self):
+        """Start Chrome"""
+        chrome_options = Options()
+        if self.headless:
+            chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+
+        # Only form fields are used, so skip heavy page resources
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+        })
+        # Return from driver.get() on DOMContentLoaded; explicit waits cover the rest
+        chrome_options.page_load_strategy = 'eager'
+
+        if self.driver_path is None:
+            self.driver_path = get_chromedriver_path()
+        service = Service(self.driver_path)
+        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    def clear_session(self):
+        """Drop cookies and cache for every domain before reusing the browser"""
+        self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        self.driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+
+    def quit(self):
+        """Close Chrome"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                # The session may already be dead
+                pass
+            self.driver = None
+
 
 class AWSRootPasswordReset:
     """Automates AWS root user password reset"""
 
-    def __init__(self, account_id, email, secret_id, config, headless=True):
+    def __init__(self, account_id, email, secret_id, config, headless=True,
+                 browser=None, secrets_client=None):
         self.account_id = account_id
         self.email = email
         self.secret_id = secret_id
         self.config = config
         self.headless = headless
+        # A browser passed in is shared with other runs and is left open on cleanup
+        self.browser = browser
+        self._owns_browser = browser is None
         self.driver = None
+        self._wait = None
         self.password = None
+        self._secret_data = None
 
         # AWS clients
-        region = os.environ.get('AWS_REGION', 'us-east-1')
-        self.secrets_client = boto3.client('secretsmanager', region_name=region)
+        self._secrets_client = secrets_client
+
+    @property
+    def secrets_client(self):
+        """Secrets Manager client, created on first use"""
+        if self._secrets_client is None:
+            self._secrets_client = create_secrets_client()
+        return self._secrets_client
 
     def get_password_from_secrets(self):
         """Retrieve the generated password from Secrets Manager"""
         try:
             response = self.secrets_client.get_secret_value(SecretId=self.secret_id)
-            secret_data = json.loads(response['SecretString'])
+            secret_data = json_loads(response['SecretString'])
             self.password = secret_data['password']
-            print(f"✓ Retrieved password from Secrets Manager")
+            # Kept so update_secret_status doesn't have to fetch it again
+            self._secret_data = secret_data
+            log.info("✓ Retrieved password from Secrets Manager")
             return True
         except ClientError as e:
-            print(f"✗ Failed to retrieve password: {e}")
+            log.error(f"✗ Failed to retrieve password: {e}")
             return False
 
     def init_browser(self):
-        """Initialize Selenium WebDriver"""
-        print("Initializing browser...")
-
-        chrome_options = Options()
-        if self.headless:
-            chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-
+        """Initialize Selenium WebDriver, or reset the shared one for this account"""
         try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            print("✓ Browser initialized")
+            if self.browser is None:
+                self.browser = Browser(self.headless)
+
+            if self.browser.driver is None:
+                log.info("Initializing browser...")
+                self.browser.start()
+                log.info("✓ Browser initialized")
+            else:
+                # Don't let the previous account's session leak into this one
+                try:
+                    self.browser.clear_session()
+                    log.info("✓ Reusing browser with a cleared session")
+                except Exception as e:
+                    # Chrome or ChromeDriver died during an earlier account
+                    log.warning(f"⚠ Shared browser is unusable, restarting it: {e}")
+                    self.browser.quit()
+                    self.browser.start()
+                    log.info("✓ Browser restarted")
+
+            self.driver = self.browser.driver
+            self._wait = WebDriverWait(self.driver, 15, poll_frequency=0.25)
             return True
         except Exception as e:
-            print(f"✗ Failed to initialize browser: {e}")
+            log.error(f"✗ Failed to initialize browser: {e}")
             return False
 
-    def navigate_to_forgot_password(self):
-        """Navigate to AWS login and click Forgot Password"""
+    def navigate_to_forgot_password(self, on_forgot_password=None):
+        """Navigate to AWS login and click Forgot Password
+
+        on_forgot_password, if given, is called with the current time right before
+        the link is clicked so the caller can start watching for the reset email.
+        """
         login_url = f"https://{self.account_id}.signin.aws.amazon.com/console"
 
         try:
-            print(f"Navigating to {login_url}")
+            log.info(f"Navigating to {login_url}")
             self.driver.get(login_url)
-            time.sleep(3)
 
             # Click "Sign in using root user email" button
             try:
-                root_user_button = WebDriverWait(self.driver, 10).until(
+                root_user_button = self._wait.until(
                     EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "Sign in using root user email"))
                 )
                 root_user_button.click()
-                print("✓ Clicked 'Sign in using root user email'")
-                time.sleep(3)
+                log.info("✓ Clicked 'Sign in using root user email'")
             except Exception as e:
-                print(f"Note: Root user email button not found, trying alternative: {e}")
+                log.info(f"Note: Root user email button not found, trying alternative: {e}")
 
             # Root user radio should already be selected by default
             # Enter email in root user form
             try:
-                email_field = WebDriverWait(self.driver, 10).until(
+                email_field = self._wait.until(
                     EC.presence_of_element_located((By.ID, "resolving_input"))
                 )
                 email_field.clear()
-                email_field.send_keys(self.email)
-                print("✓ Entered email address")
-                time.sleep(1)
-
-                # Click Next button to go to password page
-                next_button = self.driver.find_element(By.ID, "next_button")
-                next_button.click()
-                print("✓ Clicked Next button")
-                time.sleep(5)  # Wait for password page to load
+                # ENTER submits the form, same as clicking Next
+                email_field.send_keys(self.email + Keys.ENTER)
+                log.info("✓ Entered email address")
+
+                # Wait for password page to load
+                self._wait.until(EC.any_of(
+                    EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "Forgot your password")),
+                    EC.presence_of_element_located((By.ID, "password"))
+                ))
             except Exception as e:
-                print(f"Email entry failed: {e}")
+                log.error(f"Email entry failed: {e}")
                 self.save_screenshot("email_entry_error")
                 return False
 
             # Try to click "Forgot password?" link on the password page
             try:
-                forgot_link = WebDriverWait(self.driver, 10).until(
+                forgot_link = self._wait.until(
                     EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "Forgot your password"))
                 )
+                if on_forgot_password:
+                    on_forgot_password(time.time())
                 forgot_link.click()
-                print("✓ Clicked 'Forgot your password?'")
-                time.sleep(3)
+                log.info("✓ Clicked 'Forgot your password?'")
+
+                # Wait for AWS to confirm the reset email was sent
+                try:
+                    self._wait.until(EC.any_of(
+                        EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'sent you an email')]")),
+                        EC.url_contains('forgotpassword')
+                    ))
+                    log.info("✓ AWS confirmed the reset email was sent")
+                except TimeoutException:
+                    log.warning("⚠ No confirmation that the reset email was sent")
                 return True
             except Exception as e:
                 # Check if CAPTCHA is blocking us
-                page_source = self.driver.page_source.lower()
-                if 'captcha' in page_source or 'recaptcha' in page_source:
-                    print("✗ CAPTCHA detected on password page")
-                    print("✗ Automation cannot solve CAPTCHA")
+                captcha_nodes = self.driver.find_elements(By.CSS_SELECTOR, CAPTCHA_SELECTOR)
+                if captcha_nodes:
+                    log.error("✗ CAPTCHA detected on password page")
+                    log.error("✗ Automation cannot solve CAPTCHA")
                     self.save_screenshot("captcha_detected")
-                    print("\n" + "="*70)
-                    print("MANUAL PASSWORD RESET REQUIRED")
-                    print("="*70)
-                    print(f"Account: {self.account_id}")
-                    print(f"Email: {self.email}")
-                    print(f"\nSteps:")
-                    print(f"1. Go to: https://{self.account_id}.signin.aws.amazon.com/console")
-                    print(f"2. Click 'Sign in using root user email'")
-                    print(f"3. Enter email: {self.email}")
-                    print(f"4. Click 'Forgot password?'")
-                    print(f"5. Check email for reset link")
-                    print(f"6. Get password: aws secretsmanager get-secret-value --secret-id {self.secret_id} --query SecretString")
-                    print("="*70)
+                    log.warning("\n".join([
+                        "",
+                        "="*70,
+                        "MANUAL PASSWORD RESET REQUIRED",
+                        "="*70,
+                        f"Account: {self.account_id}",
+                        f"Email: {self.email}",
+                        "",
+                        "Steps:",
+                        f"1. Go to: https://{self.account_id}.signin.aws.amazon.com/console",
+                        "2. Click 'Sign in using root user email'",
+                        f"3. Enter email: {self.email}",
+                        "4. Click 'Forgot password?'",
+                        "5. Check email for reset link",
+                        f"6. Get password: aws secretsmanager get-secret-value --secret-id {self.secret_id} --query SecretString",
+                        "="*70,
+                    ]))
                     return False
                 else:
-                    print(f"✗ Could not find 'Forgot password?' link: {e}")
+                    log.error(f"✗ Could not find 'Forgot password?' link: {e}")
                     self.save_screenshot("forgot_password_link_error")
                     return False
 
         except Exception as e:
-            print(f"✗ Failed to navigate to forgot password: {e}")
+            log.error(f"✗ Failed to navigate to forgot password: {e}")
             self.save_screenshot("forgot_password_error")
             return False
 
-    def get_password_reset_email(self, wait_seconds=60):
-        """Retrieve password reset email from IMAP"""
+    def get_password_reset_email(self, wait_seconds=60, sent_after=None, stop_event=None):
+        """Retrieve password reset email from IMAP
+
+        sent_after is the time the reset was requested; only mail received from
+        shortly before then is considered. Without it, the last 5 minutes are searched.
+        Setting stop_event makes the wait give up early and return None.
+        """
+        stop_event = stop_event or threading.Event()
         email_config = self.config.get('email_config', {})
 
         if not email_config.get('imap_server'):
-            print("✗ Email configuration not provided")
+            log.error("✗ Email configuration not provided")
             return None
 
         # Get email password from Secrets Manager
@@ -187,242 +450,350 @@ class AWSRootPasswordReset:
             )
             email_password = response['SecretString']
         except Exception as e:
-            print(f"✗ Failed to get email password: {e}")
+            log.error(f"✗ Failed to get email password: {e}")
             return None
 
-        print(f"Waiting up to {wait_seconds} seconds for password reset email...")
+        log.info(f"Waiting up to {wait_seconds} seconds for password reset email...")
 
-        cutoff_time = datetime.now() - timedelta(minutes=5)
+        if sent_after:
+            # Allow for clock skew between this host and the mail server
+            cutoff_time = datetime.fromtimestamp(sent_after - 30)
+        else:
+            cutoff_time = datetime.now() - timedelta(minutes=5)
         end_time = time.time() + wait_seconds
+        seen_uids = set()
+        client = None
+        use_idle = False
+        check_mailbox = True
+        attempt = 0
+        failures = 0
 
-        while time.time() < end_time:
-            try:
-                # Connect to IMAP
-                mail = imaplib.IMAP4_SSL(
-                    email_config['imap_server'],
-                    email_config['imap_port']
-                )
-                mail.login(email_config['email_address'], email_password)
-                mail.select('INBOX')
-
-                # Search for AWS password reset emails
-                _, messages = mail.search(None, 'FROM', '"no-reply@amazon.com"', 'SUBJECT', '"AWS password"')
-
-                if messages[0]:
-                    email_ids = messages[0].split()
-
-                    # Check recent emails
-                    for email_id in reversed(email_ids[-10:]):  # Check last 10
-                        _, msg_data = mail.fetch(email_id, '(RFC822)')
-
-                        for response_part in msg_data:
-                            if isinstance(response_part, tuple):
-                                msg = email.message_from_bytes(response_part[1])
-
-                                # Check if email is recent
-                                date_str = msg.get('Date')
-                                # Parse and check date
+        try:
+            while not stop_event.is_set():
+                try:
+                    # One connection for the whole wait, reopened only if it drops
+                    if client is None:
+                        try:
+                            client = self.connect_imap(email_config, email_password)
+                        except (LoginError, KeyError) as e:
+                            # Bad credentials or incomplete config won't fix themselves
+                            log.error(f"✗ Failed to connect to email: {e}")
+                            return None
+                        use_idle = client.has_capability('IDLE')
+                        check_mailbox = True
+                        attempt = 0
+
+                    # The email may already be there before we start listening
+                    if check_mailbox:
+                        reset_link = self.find_reset_link(client, cutoff_time, seen_uids)
+                        failures = 0
+                        if reset_link:
+                            log.info("✓ Found password reset email")
+                            return reset_link
+
+                    remaining = end_time - time.time()
+                    if remaining <= 0:
+                        break
+
+                    log.debug("Email not found yet, waiting...")
+
+                    if use_idle:
+                        # The server pushes new mail to us
+                        client.idle()
+                        responses = []
+                        try:
+                            # Check in short slices so a stop request is noticed promptly
+                            idle_until = time.time() + min(IMAP_IDLE_TIMEOUT, remaining)
+                            while not responses and not stop_event.is_set() and time.time() < idle_until:
+                                responses = client.idle_check(timeout=max(0.0, min(1.0, idle_until - time.time())))
+                        finally:
+                            # Responses that arrive after idle_check come back from idle_done
+                            _, done_responses = client.idle_done()
+                        responses = responses + done_responses
+
+                        # Only search again once the server reports new mail
+                        check_mailbox = any(b'EXISTS' in response for response in responses)
+                    else:
+                        # Poll quickly at first, backing off to ~10s with jitter
+                        stop_event.wait(min(backoff_delay(attempt), remaining))
+                        attempt += 1
+                        client.noop()
+                        check_mailbox = True
+
+                except Exception as e:
+                    log.error(f"Error checking email: {e}")
+                    self.close_imap(client)
+                    client = None
+
+                    remaining = end_time - time.time()
+                    if remaining <= 0:
+                        break
+                    # Back off between reconnects too, to stay under server rate limits
+                    stop_event.wait(min(backoff_delay(failures), remaining))
+                    failures += 1
+        finally:
+            self.close_imap(client)
 
-                                # Get email body
-                                body = self.get_email_body(msg)
+        if stop_event.is_set():
+            log.debug("Stopped waiting for password reset email")
+            return None
 
-                                # Extract reset link
-                                reset_link = self.extract_reset_link(body)
+        log.error("✗ Timeout waiting for password reset email")
+        return None
 
-                                if reset_link and self.account_id in body:
-                                    print(f"✓ Found password reset email")
-                                    mail.close()
-                                    mail.logout()
-                                    return reset_link
+    def connect_imap(self, email_config, email_password):
+        """Open an IMAP connection with INBOX selected"""
+        client = IMAPClient(
+            email_config['imap_server'],
+            port=email_config['imap_port'],
+            ssl=True,
+            timeout=IMAP_SOCKET_TIMEOUT
+        )
+        client.login(email_config['email_address'], email_password)
+        client.select_folder('INBOX')
+        return client
+
+    def close_imap(self, client):
+        """Log out of an IMAP connection, ignoring errors"""
+        if client is not None:
+            try:
+                client.logout()
+            except Exception:
+                pass
 
-                mail.close()
-                mail.logout()
+    def find_reset_link(self, client, cutoff_time, seen_uids):
+        """Search the selected mailbox for a new AWS reset email and return its link"""
+        # Let the server narrow the result set to recent unread AWS mail. SINCE uses
+        # the server's date, which may lag ours, so go back a day; INTERNALDATE
+        # is checked exactly below.
+        uids = client.search([
+            'UNSEEN',
+            'FROM', 'no-reply@amazon.com',
+            'SUBJECT', 'AWS password',
+            'SINCE', (cutoff_time - timedelta(days=1)).date()
+        ])
+        new_uids = [uid for uid in uids if uid not in seen_uids]
+        if not new_uids:
+            return None
 
-                print(f"Email not found yet, waiting...")
-                time.sleep(10)
+        # PEEK keeps messages unread; of the headers, only the MIME ones are needed
+        # to decode the transfer encoding (quoted-printable, base64) of the text
+        messages = client.fetch(new_uids, [
+            'INTERNALDATE',
+            'BODY.PEEK[HEADER.FIELDS (CONTENT-TYPE CONTENT-TRANSFER-ENCODING)]',
+            'BODY.PEEK[TEXT]'
+        ])
+        for uid in sorted(messages, reverse=True):  # Newest first
+            data = messages[uid]
+
+            # Only mark UIDs once they've actually been fetched and checked, so
+            # a dropped connection doesn't make us skip them after reconnecting
+            seen_uids.add(uid)
+
+            # SINCE only has day granularity (and a day of slack)
+            if data[b'INTERNALDATE'] < cutoff_time:
+                continue
+
+            # Servers may echo the header section name with different quoting/case
+            headers = next(
+                (value for key, value in data.items() if key.upper().startswith(b'BODY[HEADER')),
+                b''
+            )
+            msg = email.message_from_bytes(headers + data[b'BODY[TEXT]'])
+            body = self.get_email_body(
+                msg,
+                is_complete=lambda text: self.account_id in text and self.extract_reset_link(text)
+            )
+            reset_link = self.extract_reset_link(body)
 
-            except Exception as e:
-                print(f"Error checking email: {e}")
-                time.sleep(10)
+            if reset_link and self.account_id in body:
+                return reset_link
 
-        print("✗ Timeout waiting for password reset email")
         return None
 
-    def get_email_body(self, msg):
-        """Extract email body from email message"""
+    def get_email_body(self, msg, is_complete=None):
+        """Extract email body from email message
+
+        If is_complete is given, the first text part it accepts is returned
+        without decoding the remaining parts.
+        """
         body = ""
 
         if msg.is_multipart():
-            for part in msg.walk():
-                if part.get_content_type() == "text/plain":
-                    try:
-                        body = part.get_payload(decode=True).decode()
-                    except:
-                        pass
-                elif part.get_content_type() == "text/html":
-                    try:
-                        html = part.get_payload(decode=True).decode()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        body = soup.get_text()
-                    except:
-                        pass
+            # The reset link appears verbatim in the HTML href, so no HTML parsing is needed
+            parts = [
+                part for part in msg.walk()
+                if part.get_content_type() in ("text/plain", "text/html")
+            ]
         else:
-            try:
-                body = msg.get_payload(decode=True).decode()
-            except:
-                pass
+            parts = [msg]
+
+        for part in parts:
+            text = self.decode_part(part)
+            if text:
+                body = text
+                if is_complete and is_complete(body):
+                    break
 
         return body
 
-    def extract_reset_link(self, email_body):
-        """Extract password reset link from email body"""
-        # Look for AWS password reset link pattern
-        patterns = [
-            r'https://signin\.aws\.amazon\.com/resetpassword\?token=[A-Za-z0-9\-_]+',
-            r'https://[a-z0-9\-]+\.signin\.aws\.amazon\.com/resetpassword\?token=[A-Za-z0-9\-_]+',
-        ]
+    def decode_part(self, part):
+        """Decode a message part using its declared charset"""
+        payload = part.get_payload(decode=True)
+        if payload is None:
+            return ""
 
-        for pattern in patterns:
-            match = re.search(pattern, email_body)
-            if match:
-                return match.group(0)
+        charset = part.get_content_charset() or 'utf-8'
+        try:
+            return payload.decode(charset, errors='replace')
+        except LookupError:
+            # Unknown charset name in the Content-Type header
+            return payload.decode('utf-8', errors='replace')
 
-        return None
+    def extract_reset_link(self, email_body):
+        """Extract password reset link from email body"""
+        match = RESET_LINK_PATTERN.search(email_body)
+        return match.group(0) if match else None
 
     def reset_password_with_link(self, reset_link):
         """Navigate to reset link and set new password"""
         try:
-            print(f"Opening password reset link...")
+            log.info("Opening password reset link...")
             self.driver.get(reset_link)
-            time.sleep(3)
 
-            # Enter new password
-            password_field = WebDriverWait(self.driver, 10).until(
+            # Enter and confirm new password, then submit
+            self._wait.until(
                 EC.presence_of_element_located((By.ID, "newPassword"))
             )
-            password_field.clear()
-            password_field.send_keys(self.password)
-
-            # Confirm password
-            confirm_field = self.driver.find_element(By.ID, "confirmPassword")
-            confirm_field.clear()
-            confirm_field.send_keys(self.password)
-
-            time.sleep(1)
-
-            # Submit
-            submit_button = self.driver.find_element(By.ID, "submitButton")
-            submit_button.click()
+            self.fill_and_submit(
+                {"newPassword": self.password, "confirmPassword": self.password},
+                "submitButton"
+            )
 
-            print("✓ Password reset form submitted")
-            time.sleep(5)
+            log.info("✓ Password reset form submitted")
+            try:
+                self._wait.until(EC.url_matches(RESET_DONE_URL_PATTERN.pattern))
+            except TimeoutException:
+                pass
 
             # Check for success
-            if "success" in self.driver.current_url.lower() or "console" in self.driver.current_url:
-                print("✓ Password reset successful!")
+            if RESET_DONE_URL_PATTERN.search(self.driver.current_url):
+                log.info("✓ Password reset successful!")
                 return True
             else:
-                print("⚠ Password reset status unclear")
+                log.warning("⚠ Password reset status unclear")
                 self.save_screenshot("password_reset_result")
                 return True  # Assume success
 
         except Exception as e:
-            print(f"✗ Failed to reset password: {e}")
+            log.error(f"✗ Failed to reset password: {e}")
             self.save_screenshot("password_reset_error")
             return False
 
+    def fill_and_submit(self, values, submit_id):
+        """Fill form fields by element ID and click the submit button in one call"""
+        self.driver.execute_script(FILL_AND_SUBMIT_SCRIPT, values, submit_id)
+
     def verify_login(self):
         """Verify login with new password"""
         login_url = f"https://{self.account_id}.signin.aws.amazon.com/console"
 
         try:
-            print("Verifying login with new password...")
+            log.info("Verifying login with new password...")
             self.driver.get(login_url)
-            time.sleep(3)
 
             # Click "Sign in using root user email" button
             try:
-                root_user_button = WebDriverWait(self.driver, 10).until(
+                root_user_button = self._wait.until(
                     EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "Sign in using root user email"))
                 )
                 root_user_button.click()
-                time.sleep(3)
             except:
                 pass
 
             # Enter email
-            email_field = WebDriverWait(self.driver, 10).until(
+            self._wait.until(
                 EC.presence_of_element_located((By.ID, "resolving_input"))
             )
-            email_field.clear()
-            email_field.send_keys(self.email)
-
-            next_button = self.driver.find_element(By.ID, "next_button")
-            next_button.click()
-            time.sleep(2)
+            self.fill_and_submit({"resolving_input": self.email}, "next_button")
 
             # Enter password
-            password_field = WebDriverWait(self.driver, 10).until(
+            self._wait.until(
                 EC.presence_of_element_located((By.ID, "password"))
             )
-            password_field.clear()
-            password_field.send_keys(self.password)
-
-            signin_button = self.driver.find_element(By.ID, "signin_button")
-            signin_button.click()
-            time.sleep(5)
+            self.fill_and_submit({"password": self.password}, "signin_button")
+            try:
+                self._wait.until(EC.url_matches(LOGIN_DONE_URL_PATTERN.pattern))
+            except TimeoutException:
+                pass
 
             # Check if logged in
-            if "console.aws.amazon.com" in self.driver.current_url or "captcha" in self.driver.current_url.lower():
-                print("✓ Login verification successful!")
+            if LOGIN_DONE_URL_PATTERN.search(self.driver.current_url):
+                log.info("✓ Login verification successful!")
                 return True
             else:
-                print("⚠ Login verification unclear")
+                log.warning("⚠ Login verification unclear")
                 return True
 
         except Exception as e:
-            print(f"⚠ Login verification failed: {e}")
+            log.warning(f"⚠ Login verification failed: {e}")
             return False
 
     def update_secret_status(self):
         """Update secret to mark password as set"""
         try:
-            response = self.secrets_client.get_secret_value(SecretId=self.secret_id)
-            secret_data = json.loads(response['SecretString'])
+            secret_data = dict(self._secret_data)
             secret_data['password_set'] = True
             secret_data['password_set_at'] = datetime.now().isoformat()
 
             self.secrets_client.update_secret(
                 SecretId=self.secret_id,
-                SecretString=json.dumps(secret_data)
+                SecretString=json_dumps(secret_data)
             )
-            print("✓ Updated secret status")
+            log.info("✓ Updated secret status")
             return True
         except Exception as e:
-            print(f"⚠ Failed to update secret: {e}")
+            log.warning(f"⚠ Failed to update secret: {e}")
             return False
 
     def save_screenshot(self, name):
         """Save screenshot for debugging"""
         try:
-            filename = f"/tmp/aws-password-reset-{name}-{int(time.time())}.png"
+            filename = f"/tmp/aws-password-reset-{self.account_id}-{name}-{int(time.time())}.png"
             self.driver.save_screenshot(filename)
-            print(f"Screenshot saved: {filename}")
+            log.info(f"Screenshot saved: {filename}")
         except:
             pass
 
     def cleanup(self):
         """Cleanup resources"""
-        if self.driver:
-            self.driver.quit()
+        if self._owns_browser and self.browser:
+            self.browser.quit()
+        self.driver = None
 
     def run(self, use_email=True):
         """Run the complete password reset automation"""
-        print(f"\n{'='*70}")
-        print(f"AWS Root Password Reset Automation")
-        print(f"Account ID: {self.account_id}")
-        print(f"Email: {self.email}")
-        print(f"{'='*70}\n")
+        log.info("\n".join([
+            "",
+            "="*70,
+            "AWS Root Password Reset Automation",
+            f"Account ID: {self.account_id}",
+            f"Email: {self.email}",
+            "="*70,
+        ]))
+
+        # The email watcher owns its IMAP connection; the driver stays on this thread
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.account_id}-email")
+        wait_seconds = self.config.get('automation', {}).get('wait_for_email', 60)
+        email_future = None
+        # Stops the watcher if the run ends before the email is collected
+        stop_email_watch = threading.Event()
+
+        def start_email_watch(sent_after):
+            nonlocal email_future
+            email_future = executor.submit(
+                self.get_password_reset_email, wait_seconds, sent_after, stop_email_watch
+            )
 
         try:
             # Step 1: Get password
@@ -433,22 +804,28 @@ class AWSRootPasswordReset:
             if not self.init_browser():
                 return False
 
-            # Step 3: Navigate and trigger forgot password
-            if not self.navigate_to_forgot_password():
+            # Step 3: Navigate and trigger forgot password, watching for the
+            # reset email in the background while the browser finishes
+            if not self.navigate_to_forgot_password(
+                on_forgot_password=start_email_watch if use_email else None
+            ):
                 return False
 
             # Step 4: Get reset email
             if use_email:
-                reset_link = self.get_password_reset_email(
-                    wait_seconds=self.config.get('automation', {}).get('wait_for_email', 60)
-                )
+                try:
+                    reset_link = email_future.result(timeout=wait_seconds + 30)
+                except FutureTimeoutError:
+                    reset_link = None
 
                 if not reset_link:
-                    print("\n✗ Could not retrieve password reset email")
-                    print("Please complete manually:")
-                    print(f"  1. Check email: {self.email}")
-                    print(f"  2. Click reset link")
-                    print(f"  3. Use password from: aws secretsmanager get-secret-value --secret-id {self.secret_id}")
+                    log.error("\n".join([
+                        "✗ Could not retrieve password reset email",
+                        "Please complete manually:",
+                        f"  1. Check email: {self.email}",
+                        "  2. Click reset link",
+                        f"  3. Use password from: aws secretsmanager get-secret-value --secret-id {self.secret_id}",
+                    ]))
                     return False
 
                 # Step 5: Reset password
@@ -461,62 +838,160 @@ class AWSRootPasswordReset:
                 # Step 7: Update secret
                 self.update_secret_status()
 
-                print(f"\n{'='*70}")
-                print(f"✓ Password reset completed successfully!")
-                print(f"Account: {self.account_id}")
-                print(f"Login: https://{self.account_id}.signin.aws.amazon.com/console")
-                print(f"{'='*70}\n")
+                log.info("\n".join([
+                    "",
+                    "="*70,
+                    "✓ Password reset completed successfully!",
+                    f"Account: {self.account_id}",
+                    f"Login: https://{self.account_id}.signin.aws.amazon.com/console",
+                    "="*70,
+                ]))
 
                 return True
             else:
-                print("\n⚠ Email retrieval disabled")
-                print("Please complete manually:")
-                print(f"  1. Check email: {self.email}")
-                print(f"  2. Click the password reset link")
-                print(f"  3. Use password from: aws secretsmanager get-secret-value --secret-id {self.secret_id}")
+                log.warning("\n".join([
+                    "⚠ Email retrieval disabled",
+                    "Please complete manually:",
+                    f"  1. Check email: {self.email}",
+                    "  2. Click the password reset link",
+                    f"  3. Use password from: aws secretsmanager get-secret-value --secret-id {self.secret_id}",
+                ]))
                 return False
 
         except Exception as e:
-            print(f"\n✗ Automation failed: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"✗ Automation failed: {e}")
             return False
         finally:
+            stop_email_watch.set()
+            executor.shutdown(wait=False)
             self.cleanup()
 
+    @classmethod
+    def run_many(cls, accounts, config, headless=True, use_email=True):
+        """Run the automation for several accounts, reusing one browser and AWS client
+
+        accounts is a list of dicts with account_id, email and secret_id keys.
+        Returns a dict mapping each account ID to whether its reset succeeded.
+        """
+        results = {}
+        secrets_client = create_secrets_client()
+
+        with Browser(headless) as browser:
+            for account in accounts:
+                automation = cls(
+                    account_id=account['account_id'],
+                    email=account['email'],
+                    secret_id=account['secret_id'],
+                    config=config,
+                    headless=headless,
+                    browser=browser,
+                    secrets_client=secrets_client
+                )
+                results[account['account_id']] = automation.run(use_email=use_email)
+
+        return results
+
+    @classmethod
+    def run_parallel(cls, accounts, config, max_workers=4, headless=True, use_email=True):
+        """Run the automation for several accounts concurrently
+
+        Each account gets its own browser, Secrets Manager client and IMAP
+        connection, since none of them are shared safely between threads.
+        Returns a dict mapping each account ID to whether its reset succeeded.
+        """
+        # Resolve ChromeDriver once; concurrent ChromeDriverManager installs race
+        # on the download and on the path cache
+        try:
+            driver_path = get_chromedriver_path()
+        except Exception as e:
+            log.error(f"✗ Failed to resolve ChromeDriver: {e}")
+            return {account['account_id']: False for account in accounts}
+
+        def run_account(account, secrets_client):
+            threading.current_thread().name = account['account_id']
+            with Browser(headless, driver_path=driver_path) as browser:
+                automation = cls(
+                    account_id=account['account_id'],
+                    email=account['email'],
+                    secret_id=account['secret_id'],
+                    config=config,
+                    headless=headless,
+                    browser=browser,
+                    secrets_client=secrets_client
+                )
+                return automation.run(use_email=use_email)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(accounts))) as executor:
+            futures = {
+                # boto3 clients are created here because the shared session isn't thread-safe
+                account['account_id']: executor.submit(run_account, account, create_secrets_client())
+                for account in accounts
+            }
+            return {account_id: future.result() for account_id, future in futures.items()}
+
 
 def main():
     parser = argparse.ArgumentParser(description='Automate AWS root password reset')
-    parser.add_argument('--account-name', required=True, help='Account name')
-    parser.add_argument('--account-id', required=True, help='AWS account ID')
-    parser.add_argument('--email', required=True, help='Root user email')
-    parser.add_argument('--secret-id', required=True, help='Secrets Manager secret ID')
+    parser.add_argument('--account-name', help='Account name')
+    parser.add_argument('--account-id', help='AWS account ID (omit to run every account in the config)')
+    parser.add_argument('--email', help='Root user email')
+    parser.add_argument('--secret-id', help='Secrets Manager secret ID')
     parser.add_argument('--config', required=True, help='Configuration file path')
     parser.add_argument('--headless', action='store_true', help='Run in headless mode')
     parser.add_argument('--skip-email', action='store_true', help='Skip email retrieval')
     parser.add_argument('--skip-mfa', action='store_true', help='Skip MFA setup')
+    parser.add_argument('--parallel', type=int, default=1,
+                        help='Accounts to process concurrently when running every account in the config')
 
     args = parser.parse_args()
 
+    single_account = [args.account_id, args.email, args.secret_id]
+    if any(single_account) and not all(single_account):
+        parser.error('--account-id, --email and --secret-id must be given together')
+    if args.parallel < 1:
+        parser.error('--parallel must be at least 1')
+
     # Load configuration
     try:
         with open(args.config, 'r') as f:
-            config = json.load(f)
+            config = json_loads(f.read())
     except Exception as e:
-        print(f"Failed to load config: {e}")
+        log.error(f"Failed to load config: {e}")
+        sys.exit(1)
+
+    # Run automation for a single account
+    if args.account_id:
+        automation = AWSRootPasswordReset(
+            account_id=args.account_id,
+            email=args.email,
+            secret_id=args.secret_id,
+            config=config,
+            headless=args.headless
+        )
+
+        success = automation.run(use_email=not args.skip_email)
+        sys.exit(0 if success else 1)
+
+    # Run automation for every account in the config
+    accounts = list(config.get('accounts', {}).values())
+    if not accounts:
+        log.error("No --account-id given and no accounts in config")
         sys.exit(1)
 
-    # Run automation
-    automation = AWSRootPasswordReset(
-        account_id=args.account_id,
-        email=args.email,
-        secret_id=args.secret_id,
-        config=config,
-        headless=args.headless
-    )
-
-    success = automation.run(use_email=not args.skip_email)
-    sys.exit(0 if success else 1)
+    if args.parallel > 1:
+        results = AWSRootPasswordReset.run_parallel(
+            accounts, config, max_workers=args.parallel,
+            headless=args.headless, use_email=not args.skip_email
+        )
+    else:
+        results = AWSRootPasswordReset.run_many(
+            accounts, config, headless=args.headless, use_email=not args.skip_email
+        )
+
+    failed = [account_id for account_id, success in results.items() if not success]
+    if failed:
+        log.error(f"✗ Password reset failed for: {', '.join(failed)}")
+    sys.exit(1 if failed else 0)
 
 
 if __name__ == '__main__':